@@ -1,5 +1,6 @@
 import streamlit as st
 import time
+import perf_metrics
 
 # --- 1. 頁面基本設定 ---
 st.set_page_config(page_title="人生八輪深度排序", page_icon="🧬")
@@ -120,10 +121,12 @@ def get_next_battle():
         
         # 檢查快取：這兩人是否比過？(例如 A 曾在上一輪贏過 B)
         if (champion, challenger) in st.session_state.match_history:
+            perf_metrics.inc("sorting_cache_hits")
             # Champion 曾贏過 -> 自動判定勝，繼續下一位
             st.session_state.challenger_idx += 1
             continue
         elif (challenger, champion) in st.session_state.match_history:
+            perf_metrics.inc("sorting_cache_hits")
             # Challenger 曾贏過 -> 自動判定勝 (換人)，繼續下一位
             st.session_state.history_stack.append(champion)
             st.session_state.current_champion = challenger
@@ -141,7 +144,8 @@ st.title("🧬 人生價值觀深度排序")
 st.progress(len(st.session_state.ranked_results) / 8, text="排序進度")
 
 # 執行邏輯引擎，取得當前狀態
-status, p1, p2 = get_next_battle()
+with perf_metrics.timed("get_next_battle"):
+    status, p1, p2 = get_next_battle()
 
 if status == "ASK":
     st.write("")
@@ -181,10 +185,13 @@ elif status == "DONE":
             del st.session_state[key]
         st.rerun()
 
-# --- 顯示除錯資訊 (可選，讓你知道程式在想什麼) ---
-# with st.expander("🔍 查看程式邏輯狀態 (Debug)"):
-#     st.write(f"已排名: {st.session_state.ranked_results}")
-#     st.write(f"剩餘清單: {st.session_state.candidates}")
-#     st.write(f"歷史堆疊(Stack): {st.session_state.history_stack}")
-#     st.write(f"目前擂台主: {st.session_state.current_champion}")
-#     st.write(f"下一位對手索引: {st.session_state.challenger_idx}")
\ No newline at end of file
+# --- 顯示除錯資訊 (隱藏管理頁：網址加上 ?admin=1 才會顯示) ---
+if st.query_params.get("admin") == "1":
+    with st.expander("🔍 查看程式邏輯狀態 (Debug)"):
+        st.write(f"已排名: {st.session_state.ranked_results}")
+        st.write(f"剩餘清單: {st.session_state.candidates}")
+        st.write(f"歷史堆疊(Stack): {st.session_state.history_stack}")
+        st.write(f"目前擂台主: {st.session_state.current_champion}")
+        st.write(f"下一位對手索引: {st.session_state.challenger_idx}")
+
+perf_metrics.render_admin_panel()
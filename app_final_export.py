@@ -1,11 +1,20 @@
 import streamlit as st
 import pandas as pd
 import io
-from datetime import date
+import uuid
+from datetime import date, datetime
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as fm
 import numpy as np
 import os
+import sys
+import time
+import perf_metrics
+import report_html
+import session_export
+
+# 整段執行計時起點 (Streamlit 每次 rerun 都會從頭執行本檔)
+SCRIPT_START = time.perf_counter()
 
 # --- 1. 全局配置 ---
 ALL_ITEMS = ["健康", "工作", "家庭", "休閒", "情緒", "成長", "人際", "財富"]
@@ -60,7 +69,11 @@ plt.rcParams['axes.unicode_minus'] = False
 # --- 3. 狀態管理與初始化 ---
 def initialize_state():
     if 'initialized' not in st.session_state:
+        start = time.perf_counter()
         st.session_state.stage = 0 
+        st.session_state.session_id = f"{datetime.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+        st.session_state.comparison_log = [] # 原始比較紀錄 (匯出用)
+        st.session_state.session_saved = False
         
         # 基本資料
         st.session_state.user_info = {"name": "", "job": "", "gender": "", "birthday": "", "age": ""}
@@ -94,14 +107,31 @@ def initialize_state():
         st.session_state.keyword_to_category = {} 
 
         st.session_state.initialized = True
+        perf_metrics.observe("state_init", time.perf_counter() - start)
 
 initialize_state()
+# 本次執行開始時的 stage (轉換階段的那次執行仍歸在原 stage)
+RUN_STAGE = st.session_state.get("stage", 0)
 
 
 # --- 4. 所有邏輯函數定義 (Logic Functions) ---
 
+def observe_script_run():
+    """記錄本次整段執行耗時 (依開始時的 stage 分類)"""
+    perf_metrics.observe("script_run", time.perf_counter() - SCRIPT_START, stage=RUN_STAGE)
+
+def rerun():
+    """st.rerun() 會中斷本次執行，先記錄耗時再重新執行"""
+    observe_script_run()
+    st.rerun()
+
 def get_sorting_status(prefix):
     """通用排序邏輯 (堆疊回溯法)"""
+    with perf_metrics.timed("get_sorting_status", prefix=prefix):
+        return _resolve_sorting(prefix)
+
+def _resolve_sorting(prefix):
+    """自動推算迴圈：依快取跳過已比過的組合，直到需要詢問或排完"""
     candidates = st.session_state[f'{prefix}candidates']
     ranked_list = st.session_state[f'{prefix}ranked_results']
     stack = st.session_state[f'{prefix}history_stack']
@@ -135,9 +165,11 @@ def get_sorting_status(prefix):
         challenger = candidates[challenger_idx]
         
         if (champion, challenger) in history: 
+            perf_metrics.inc("sorting_cache_hits", prefix=prefix)
             st.session_state[f'{prefix}challenger_idx'] += 1
             continue
         elif (challenger, champion) in history: 
+            perf_metrics.inc("sorting_cache_hits", prefix=prefix)
             stack.append(champion)
             st.session_state[f'{prefix}current_champion'] = challenger
             st.session_state[f'{prefix}challenger_idx'] += 1
@@ -147,9 +179,38 @@ def get_sorting_status(prefix):
 
     return "DONE", None, None
 
+def log_comparison(stage, winner, loser, category=None):
+    """記錄每一次使用者實際作答的比較"""
+    entry = {"stage": stage, "winner": winner, "loser": loser, "at": datetime.now().isoformat(timespec="seconds")}
+    if category is not None: entry["category"] = category
+    st.session_state.comparison_log.append(entry)
+
+def save_completed_session():
+    """協談完成時寫入場次紀錄 (需設定 WHEEL_SESSION_LOG)，每場只寫一次；失敗時於 Stage 5 重試"""
+    if st.session_state.session_saved:
+        return
+    record = {
+        "session_id": st.session_state.session_id,
+        "completed_at": datetime.now().isoformat(timespec="seconds"),
+        "user_info": st.session_state.user_info,
+        "importance_scores": st.session_state.importance_scores,
+        "initial_ranked_results": st.session_state.initial_ranked_results,
+        "final_ranked_results": st.session_state.final_ranked_results,
+        "keywords_map": st.session_state.keywords_map,
+        "deepest_keywords": st.session_state.deepest_keywords,
+        "comparison_log": st.session_state.comparison_log,
+    }
+    try:
+        session_export.append_session(record)
+        st.session_state.session_saved = True
+    except OSError as e:
+        # 紀錄失敗不影響協談者取得報表，session_saved 維持 False，下次 rerun 會再試
+        print(f"⚠️ 場次紀錄寫入失敗 ({st.session_state.session_id})：{e}", file=sys.stderr)
+
 def record_sorting_win(prefix, winner, loser):
     """通用記錄勝負邏輯"""
     st.session_state[f'{prefix}match_history'][(winner, loser)] = True
+    log_comparison(1 if prefix == 'initial_' else 4, winner, loser)
     current_champ = st.session_state[f'{prefix}current_champion']
     
     if winner == current_champ:
@@ -162,8 +223,10 @@ def record_sorting_win(prefix, winner, loser):
     status, _, _ = get_sorting_status(prefix)
     if status == "DONE":
         if prefix == 'initial_': st.session_state.stage = 2 
-        elif prefix == 'final_': st.session_state.stage = 5 
-    st.rerun()
+        elif prefix == 'final_':
+            st.session_state.stage = 5
+            save_completed_session()
+    rerun()
 
 def process_stage2_input(category, k1, k2, k3):
     """Stage 2: 處理輸入並儲存"""
@@ -204,7 +267,7 @@ def process_stage2_input(category, k1, k2, k3):
     
     st.session_state.current_keyword_index += 1
     if st.session_state.current_keyword_index >= 8: st.session_state.stage = 3
-    st.rerun()
+    rerun()
 
 def stage2_go_back():
     """Stage 2: 回上一頁"""
@@ -240,6 +303,7 @@ def record_stage3_win(winner, loser):
     cat_list = st.session_state.initial_ranked_results
     current_cat = cat_list[st.session_state.stage3_cat_idx]
     status = st.session_state.stage3_comp_status[current_cat]
+    log_comparison(3, winner, loser, category=current_cat)
 
     status['winner'] = winner
     
@@ -264,12 +328,50 @@ def record_stage3_win(winner, loser):
             st.session_state.final_current_champion = final_kws[0]
             st.session_state.final_challenger_idx = 1
             
-    st.rerun()
+    rerun()
+
+def build_report_data():
+    """整理報表資料 (Excel / HTML / 畫面表格共用，避免內容不一致)"""
+    info = st.session_state.user_info
+    conscious = st.session_state.initial_ranked_results
+    subconscious = st.session_state.final_ranked_results
+
+    rows = []
+    for i in range(8):
+        c_item = conscious[i] if i < len(conscious) else ""
+        # 潛意識：顯示對應的面向
+        s_item = ""
+        if i < len(subconscious):
+            s_item = st.session_state.keyword_to_category.get(subconscious[i], "")
+        rows.append({
+            "rank": i + 1,
+            "conscious": c_item,
+            "keywords": list(st.session_state.keywords_map.get(c_item, ["", "", ""])),
+            "subconscious": s_item,
+        })
+
+    return {
+        "title": "人生八輪協談紀錄表",
+        "info": [
+            ('協談者：', info['name']),
+            ('協談日期：', date.today().strftime("%Y-%m-%d")),
+            ('職  業：', info['job']),
+            ('性  別：', info['gender']),
+            ('年  齡：', info['age']),
+        ],
+        "scores": [(item, st.session_state.importance_scores[item]) for item in ALL_ITEMS],
+        "rows": rows,
+    }
 
-def create_radar_chart():
+def create_radar_chart(scores):
     """繪製雷達圖"""
-    scores = [st.session_state.importance_scores[item] for item in ALL_ITEMS]
-    N = len(ALL_ITEMS)
+    with perf_metrics.timed("create_radar_chart"):
+        return _draw_radar_chart(scores)
+
+def _draw_radar_chart(scores):
+    labels = [item for item, _ in scores]
+    scores = [score for _, score in scores]
+    N = len(labels)
     angles = np.linspace(0, 2 * np.pi, N, endpoint=False).tolist()
     scores += scores[:1]
     angles += angles[:1]
@@ -283,7 +385,7 @@ def create_radar_chart():
     ax.set_theta_offset(np.pi / 2)
     ax.set_theta_direction(-1)
     ax.set_xticks(angles[:-1])
-    ax.set_xticklabels(ALL_ITEMS, fontproperties=font_prop, fontsize=10)
+    ax.set_xticklabels(labels, fontproperties=font_prop, fontsize=10)
     
     ax.set_yticks([2, 4, 6, 8, 10])
     ax.set_yticklabels(["2", "4", "6", "8", "10"], color="grey", size=8)
@@ -295,8 +397,12 @@ def create_radar_chart():
     buf.seek(0)
     return buf
 
-def generate_excel_report():
+def generate_excel_report(data):
     """生成 Excel (A4, 16pt, JhengHei, 上下半部佈局)"""
+    with perf_metrics.timed("generate_excel_report"):
+        return _build_excel_report(data)
+
+def _build_excel_report(data):
     output = io.BytesIO()
     workbook = pd.ExcelWriter(output, engine='xlsxwriter')
     
@@ -325,26 +431,19 @@ def generate_excel_report():
     worksheet.set_column('F:F', 20) # 潛意識
 
     # --- 上半部 ---
-    worksheet.merge_range('A1:F1', '人生八輪協談紀錄表', fmt_header)
+    worksheet.merge_range('A1:F1', data['title'], fmt_header)
 
     # 左：雷達圖 (A2)
-    radar_buf = create_radar_chart()
+    radar_buf = create_radar_chart(data['scores'])
     worksheet.insert_image('A2', 'radar.png', {'image_data': radar_buf, 'x_scale': 1.1, 'y_scale': 1.1})
     
     # 右：基本資料 (D2-F7)
-    info = st.session_state.user_info
     worksheet.write('D2', '基本資料', workbook.book.add_format({'bold': True, 'font_size': 18, 'align': 'center', 'font_name': font_name}))
     
-    fields = [
-        ('D3', '協談者：', 'E3:F3', info['name']),
-        ('D4', '協談日期：', 'E4:F4', date.today().strftime("%Y-%m-%d")),
-        ('D5', '職  業：', 'E5:F5', info['job']),
-        ('D6', '性  別：', 'E6:F6', info['gender']),
-        ('D7', '年  齡：', 'E7:F7', info['age'])
-    ]
-    for lbl_cell, lbl_txt, val_cell, val_txt in fields:
-        worksheet.write(lbl_cell, lbl_txt, fmt_label)
-        worksheet.merge_range(val_cell, val_txt, fmt_value)
+    for i, (lbl_txt, val_txt) in enumerate(data['info']):
+        r = 3 + i
+        worksheet.write(f'D{r}', lbl_txt, fmt_label)
+        worksheet.merge_range(f'E{r}:F{r}', val_txt, fmt_value)
 
     # --- 下半部：對照表格 ---
     row_idx = 14
@@ -353,32 +452,26 @@ def generate_excel_report():
     worksheet.merge_range(row_idx, 2, row_idx, 4, '聯 想 詞', fmt_th) 
     worksheet.write(row_idx, 5, '潛意識', fmt_th)
 
-    conscious = st.session_state.initial_ranked_results
-    subconscious = st.session_state.final_ranked_results 
-    
-    for i in range(8):
+    for i, row in enumerate(data['rows']):
         r = row_idx + 1 + i
-        rank = i + 1
-        c_item = conscious[i] if i < len(conscious) else ""
-        kw_list = st.session_state.keywords_map.get(c_item, ["", "", ""])
-        
-        # 潛意識：顯示對應的面向
-        s_item = ""
-        if i < len(subconscious):
-            s_kw = subconscious[i]
-            s_item = st.session_state.keyword_to_category.get(s_kw, "")
+        kw_list = row['keywords']
 
-        worksheet.write(r, 0, rank, fmt_center)
-        worksheet.write(r, 1, c_item, fmt_center)
+        worksheet.write(r, 0, row['rank'], fmt_center)
+        worksheet.write(r, 1, row['conscious'], fmt_center)
         worksheet.write(r, 2, kw_list[0], fmt_center)
         worksheet.write(r, 3, kw_list[1], fmt_center)
         worksheet.write(r, 4, kw_list[2], fmt_center)
-        worksheet.write(r, 5, s_item, fmt_center)
+        worksheet.write(r, 5, row['subconscious'], fmt_center)
 
     workbook.close()
     output.seek(0)
     return output
 
+def generate_html_report(data):
+    """生成列印版 HTML (A4 版面與 Excel 相同，可直接列印或另存 PDF)"""
+    with perf_metrics.timed("generate_html_report"):
+        return report_html.render_html_report(data, font_path=FONT_PATH)
+
 
 # --- 5. 主畫面渲染流程 (Main Render Loop) ---
 
@@ -400,7 +493,7 @@ if st.session_state.stage == 0:
         
         if st.form_submit_button("開始測驗"):
             st.session_state.stage = 1
-            st.rerun()
+            rerun()
 
 elif st.session_state.stage == 1:
     # --- Stage 1: 表意識排序 ---
@@ -421,7 +514,7 @@ elif st.session_state.stage == 2:
     
     if current_idx >= len(sorted_cats):
         st.session_state.stage = 3
-        st.rerun()
+        rerun()
 
     current_cat = sorted_cats[current_idx]
     
@@ -472,58 +565,50 @@ elif st.session_state.stage == 5:
     # --- Stage 5: 結果 ---
     st.balloons()
     st.title("🎉 協談完成！")
+    save_completed_session() # 先前寫入失敗時重試
     
-    # 預覽雷達圖
-    radar_buf = create_radar_chart()
-    st.image(radar_buf, caption='權重圖')
+    report = build_report_data()
+
+    # 預覽雷達圖 (SVG，不需每次 rerun 重新輸出 300 dpi PNG；st.image 無法使用頁面字型，故內嵌標籤字型)
+    st.image(report_html.radar_svg(report['scores'], font_path=FONT_PATH), caption='權重圖')
     
     st.divider()
     st.subheader("最終協談結果分析表")
     
-    # 準備顯示用的表格資料 (與 Excel 結構一致)
-    conscious_list = st.session_state.initial_ranked_results
-    subconscious_keywords = st.session_state.final_ranked_results
-    
-    table_data = []
-    for i in range(8):
-        # 1. 順位
-        rank = i + 1
-        
-        # 2. 表意識
-        c_item = conscious_list[i] if i < len(conscious_list) else ""
-        
-        # 3. 聯想詞
-        kw_list = st.session_state.keywords_map.get(c_item, ["", "", ""])
-        
-        # 4. 潛意識 (抓出對應的面向名稱)
-        s_item = ""
-        if i < len(subconscious_keywords):
-            s_kw = subconscious_keywords[i]
-            s_item = st.session_state.keyword_to_category.get(s_kw, "")
-            
-        table_data.append({
-            "順位": rank,
-            "表意識": c_item,
-            "聯想詞 1": kw_list[0],
-            "聯想詞 2": kw_list[1],
-            "聯想詞 3": kw_list[2],
-            "潛意識": s_item
-        })
+    # 顯示用的表格資料 (與報表共用同一份資料)
+    table_data = [{
+        "順位": row['rank'],
+        "表意識": row['conscious'],
+        "聯想詞 1": row['keywords'][0],
+        "聯想詞 2": row['keywords'][1],
+        "聯想詞 3": row['keywords'][2],
+        "潛意識": row['subconscious']
+    } for row in report['rows']]
     
     # 顯示為靜態表格，清楚呈現對照
     df_display = pd.DataFrame(table_data)
     st.table(df_display.set_index("順位"))
     
     st.divider()
-    excel_file = generate_excel_report()
+    # 報表於點擊下載時才產生，rerun 不會重複建立檔案 (data 傳入 callable 需 streamlit>=1.52)
     st.download_button(
         label="📥 下載完整協談報表 (Excel)",
-        data=excel_file,
+        data=lambda: generate_excel_report(report),
         file_name=f"wheel_of_life_{st.session_state.user_info['name']}.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         use_container_width=True
     )
+    st.download_button(
+        label="🖨️ 下載列印版報表 (HTML，可另存 PDF)",
+        data=lambda: generate_html_report(report),
+        file_name=f"wheel_of_life_{st.session_state.user_info['name']}.html",
+        mime="text/html",
+        use_container_width=True
+    )
     
     if st.button("🔄 重新開始"):
         st.session_state.clear()
-        st.rerun()
\ No newline at end of file
+        rerun()
+
+perf_metrics.render_admin_panel()
+observe_script_run()
@@ -0,0 +1,181 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+# --- 效能量測 (Opt-in Instrumentation) ---
+# 設定環境變數 WHEEL_METRICS=1 才會啟用；未啟用時所有量測皆為 no-op。
+# 本模組在 Streamlit 行程中只會載入一次，因此統計資料會跨 rerun / 跨 session 累積。
+
+ENABLED = os.environ.get("WHEEL_METRICS", "").lower() in ("1", "true", "yes")
+
+# 直方圖區間 (秒)，與 Prometheus 預設值相近
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NULL = nullcontext()
+_lock = threading.Lock()
+_histograms = {}  # {(phase, labels): [bucket_counts, sum, count]}
+_counters = {}    # {(name, labels): value}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(phase, seconds, **labels):
+    """記錄一筆耗時 (秒)"""
+    if not ENABLED:
+        return
+    idx = bisect_left(BUCKETS, seconds)
+    key = _key(phase, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        hist[0][idx] += 1
+        hist[1] += seconds
+        hist[2] += 1
+
+
+def inc(name, amount=1, **labels):
+    """累加計數器"""
+    if not ENABLED or not amount:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+@contextmanager
+def _timer(phase, labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(phase, time.perf_counter() - start, **labels)
+
+
+def timed(phase, **labels):
+    """量測區塊耗時：with timed("create_radar_chart"): ...
+    例外 (包含 st.rerun 的中斷) 發生時仍會記錄。"""
+    if not ENABLED:
+        return _NULL
+    return _timer(phase, labels)
+
+
+def reset():
+    """清除所有統計"""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def snapshot():
+    """回傳各階段摘要：[{phase, labels, count, sum, avg, p50, p95}, ...]"""
+    with _lock:
+        items = [(k, list(h[0]), h[1], h[2]) for k, h in _histograms.items()]
+    rows = []
+    for (phase, labels), buckets, total, count in sorted(items):
+        rows.append({
+            "phase": phase,
+            "labels": ", ".join(f"{k}={v}" for k, v in labels),
+            "count": count,
+            "sum": total,
+            "avg": total / count if count else 0.0,
+            "p50": _quantile(buckets, count, 0.5),
+            "p95": _quantile(buckets, count, 0.95),
+        })
+    return rows
+
+
+def counters():
+    """回傳計數器：[{name, labels, value}, ...]"""
+    with _lock:
+        items = sorted(_counters.items())
+    return [{"name": name, "labels": ", ".join(f"{k}={v}" for k, v in labels), "value": value}
+            for (name, labels), value in items]
+
+
+def _quantile(buckets, count, q):
+    """以區間上界估計分位數 (與 Prometheus histogram_quantile 同樣粗略)"""
+    if not count:
+        return 0.0
+    target = q * count
+    seen = 0
+    for i, n in enumerate(buckets):
+        seen += n
+        if seen >= target:
+            return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+    return float("inf")
+
+
+def _fmt_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def render_prometheus():
+    """輸出 Prometheus text exposition format"""
+    with _lock:
+        hists = sorted((k, list(h[0]), h[1], h[2]) for k, h in _histograms.items())
+        ctrs = sorted(_counters.items())
+
+    lines = [
+        "# HELP wheel_phase_seconds Time spent in each instrumented phase.",
+        "# TYPE wheel_phase_seconds histogram",
+    ]
+    for (phase, labels), buckets, total, count in hists:
+        base = (("phase", phase),) + labels
+        cumulative = 0
+        for upper, n in zip(BUCKETS, buckets):
+            cumulative += n
+            lines.append(f"wheel_phase_seconds_bucket{_fmt_labels(base, [('le', repr(upper))])} {cumulative}")
+        lines.append(f"wheel_phase_seconds_bucket{_fmt_labels(base, [('le', '+Inf')])} {count}")
+        lines.append(f"wheel_phase_seconds_sum{_fmt_labels(base)} {total:.9f}")
+        lines.append(f"wheel_phase_seconds_count{_fmt_labels(base)} {count}")
+
+    seen = set()
+    for (name, labels), value in ctrs:
+        metric = f"wheel_{name}_total"
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{_fmt_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def render_admin_panel():
+    """隱藏管理頁：網址加上 ?admin=1 才會顯示 (唯讀；統計為全行程共用，不提供清除)"""
+    import streamlit as st
+    import pandas as pd
+
+    if st.query_params.get("admin") != "1":
+        return
+
+    with st.expander("📊 效能統計 (Admin)"):
+        if not ENABLED:
+            st.info("尚未啟用量測，請以環境變數 WHEEL_METRICS=1 啟動。")
+            return
+
+        rows = snapshot()
+        if rows:
+            df = pd.DataFrame(rows)
+            for col in ("sum", "avg", "p50", "p95"):
+                df[col] = (df[col] * 1000).round(2)
+            st.caption("時間單位：毫秒 (p50 / p95 為區間上界估計)")
+            st.dataframe(df.rename(columns={"sum": "sum_ms", "avg": "avg_ms", "p50": "p50_ms", "p95": "p95_ms"}),
+                         hide_index=True, use_container_width=True)
+        else:
+            st.write("尚無資料。")
+
+        ctr_rows = counters()
+        if ctr_rows:
+            st.dataframe(pd.DataFrame(ctr_rows), hide_index=True, use_container_width=True)
+
+        text = render_prometheus()
+        st.download_button("⬇️ 下載 Prometheus 格式", data=text, file_name="wheel_metrics.prom", mime="text/plain")
+        st.code(text, language="text")
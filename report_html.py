@@ -0,0 +1,246 @@
+import io
+import os
+import math
+import base64
+import string
+import threading
+from html import escape
+from functools import lru_cache
+
+# --- 列印版報表 (HTML, A4) ---
+# 與 Excel 報表共用同一份 report data (見 app_final_export.build_report_data)，
+# 雷達圖以 inline SVG 繪製，字型只保留報表中用到的字 (需 fontTools，matplotlib 已內含)。
+# 完整字型 (約 16 MB) 每個行程只解析一次：先於背景裁成常用字 (Big5 常用字) 的底稿，
+# 之後每份報表再從底稿裁出實際用到的字；底稿完成前及底稿沒有的罕用字，改用系統字型。
+# 瀏覽器開啟後「列印 → 另存為 PDF」即可得到 A4 PDF。
+
+FALLBACK_FONTS = "'Microsoft JhengHei', 'Noto Sans CJK TC', 'PingFang TC', 'SimHei', sans-serif"
+
+# 與 create_radar_chart 相同的配色與刻度
+RADAR_COLOR = "#1E88E5"
+RADAR_TICKS = (2, 4, 6, 8, 10)
+RADAR_MAX = 10
+
+# 版面固定文字 (字型子集也需包含)
+INFO_CAPTION = "基本資料"
+RESULT_HEADERS = ("順位", "表意識", "聯 想 詞", "潛意識")
+
+
+def radar_svg(scores, size=300, font_path=None):
+    """繪製雷達圖 SVG (起點朝上、順時針，與 Matplotlib 版本一致)
+
+    單獨顯示 (如 st.image) 時無法使用頁面字型，可傳入 font_path 內嵌標籤用到的字。
+    """
+    labels = [item for item, _ in scores]
+    n = len(scores)
+    cx = cy = size / 2
+    radius = size * 0.34
+
+    def point(i, value):
+        angle = 2 * math.pi * i / n
+        r = radius * value / RADAR_MAX
+        return cx + r * math.sin(angle), cy - r * math.cos(angle)
+
+    face, family = "", FALLBACK_FONTS
+    if font_path and os.path.exists(font_path):
+        face = _radar_font_face(font_path, "".join(sorted(set("".join(labels) + "".join(map(str, RADAR_TICKS))))))
+        if face:
+            family = f"'ReportCJK', {FALLBACK_FONTS}"
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" width="{size}" height="{size}" '
+             f'font-family="{family}">']
+    if face:
+        parts.append(f"<style>{face}</style>")
+
+    # 背景格線 (同心多邊形 + 放射線)
+    for tick in RADAR_TICKS:
+        ring = " ".join(f"{x:.1f},{y:.1f}" for x, y in (point(i, tick) for i in range(n)))
+        parts.append(f'<polygon points="{ring}" fill="none" stroke="#ddd" stroke-width="0.8"/>')
+        _, ty = point(0, tick)
+        parts.append(f'<text x="{cx + 3:.1f}" y="{ty + 3:.1f}" font-size="8" fill="grey">{tick}</text>')
+    for i in range(n):
+        x, y = point(i, RADAR_MAX)
+        parts.append(f'<line x1="{cx}" y1="{cy}" x2="{x:.1f}" y2="{y:.1f}" stroke="#ddd" stroke-width="0.8"/>')
+
+    # 分數區域
+    shape = " ".join(f"{x:.1f},{y:.1f}" for x, y in (point(i, s) for i, (_, s) in enumerate(scores)))
+    parts.append(f'<polygon points="{shape}" fill="{RADAR_COLOR}" fill-opacity="0.4" '
+                 f'stroke="{RADAR_COLOR}" stroke-width="1"/>')
+
+    # 面向標籤
+    for i, label in enumerate(labels):
+        x, y = point(i, RADAR_MAX * 1.18)
+        parts.append(f'<text x="{x:.1f}" y="{y + 4:.1f}" font-size="12" text-anchor="middle">{escape(label)}</text>')
+
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+_base_fonts = {}  # {font_path: 常用字子集 bytes；None 表示建立中或失敗}
+_base_lock = threading.Lock()
+_radar_faces = {}
+
+
+@lru_cache(maxsize=1)
+def _common_chars():
+    """Big5 符號區與常用字區 (0xA140-0xC67E) 的所有字，加上 ASCII 可列印字元"""
+    chars = set(string.printable.strip() + " ")
+    for hi in range(0xA1, 0xC7):
+        for lo in list(range(0x40, 0x7F)) + list(range(0xA1, 0xFF)):
+            try:
+                chars.add(bytes([hi, lo]).decode("big5"))
+            except UnicodeDecodeError:
+                pass
+    return "".join(sorted(chars))
+
+
+def _subset_options(flavor):
+    from fontTools import subset
+    options = subset.Options()
+    options.flavor = flavor
+    options.layout_features = []
+    options.name_IDs = []
+    options.hinting = False
+    options.notdef_outline = False
+    return options
+
+
+def _subset_bytes(data, text, flavor):
+    """從字型 (bytes) 裁出 text 用到的字形"""
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+
+    font = TTFont(io.BytesIO(data), lazy=True, recalcBBoxes=False)
+    options = _subset_options(flavor)
+    subsetter = subset.Subsetter(options=options)
+    subsetter.populate(text=text)
+    subsetter.subset(font)
+    buf = io.BytesIO()
+    font.flavor = flavor
+    font.save(buf)
+    font.close()
+    return buf.getvalue()
+
+
+def _build_base_font(font_path):
+    try:
+        with open(font_path, "rb") as f:
+            base = _subset_bytes(f.read(), _common_chars(), None)
+    except Exception:
+        return  # 維持 None，之後一律使用系統字型
+    with _base_lock:
+        _base_fonts[font_path] = base
+
+
+def _base_font(font_path):
+    """回傳常用字底稿 (bytes)；第一次呼叫時於背景建立 (約數秒)，完成前回傳 None"""
+    with _base_lock:
+        if font_path in _base_fonts:
+            return _base_fonts[font_path]
+        _base_fonts[font_path] = None
+    try:
+        import fontTools  # noqa: F401
+    except ImportError:
+        return None
+    threading.Thread(target=_build_base_font, args=(font_path,), daemon=True).start()
+    return None
+
+
+def _subset_font_face(font_path, chars):
+    """只保留 chars 中的字形，回傳 @font-face 宣告；底稿尚未就緒或失敗時回傳空字串"""
+    base = _base_font(font_path)
+    if not base:
+        return ""
+    try:
+        woff = _subset_bytes(base, chars, "woff")  # zlib 壓縮，不需額外安裝 brotli
+    except Exception:
+        return ""
+
+    data = base64.b64encode(woff).decode("ascii")
+    return ("@font-face { font-family: 'ReportCJK'; "
+            f"src: url(data:font/woff;base64,{data}) format('woff'); }}")
+
+
+def _radar_font_face(font_path, chars):
+    """雷達圖標籤固定不變，內嵌字型裁好後即快取"""
+    key = (font_path, chars)
+    if key not in _radar_faces:
+        face = _subset_font_face(font_path, chars)
+        if not face:
+            return ""
+        _radar_faces[key] = face
+    return _radar_faces[key]
+
+
+def _report_text(data):
+    """報表中實際顯示的文字 (未經 HTML 跳脫)，用來決定字型子集"""
+    parts = [data["title"], INFO_CAPTION, *RESULT_HEADERS]
+    parts += [str(tick) for tick in RADAR_TICKS]
+    parts += [item for item, _ in data["scores"]]
+    for label, value in data["info"]:
+        parts += [label, str(value)]
+    for row in data["rows"]:
+        parts += [str(row["rank"]), row["conscious"], *row["keywords"], row["subconscious"]]
+    return "".join(parts)
+
+
+def _font_css(font_path, text):
+    """依報表實際用到的字產生字型設定"""
+    if font_path and os.path.exists(font_path):
+        chars = "".join(sorted(set(text)))
+        face = _subset_font_face(font_path, chars)
+        if face:
+            return face, f"'ReportCJK', {FALLBACK_FONTS}"
+    return "", FALLBACK_FONTS
+
+
+CSS = """
+@page { size: A4; margin: 12mm 19mm; }
+* { box-sizing: border-box; }
+body { font-family: %(family)s; font-size: 16pt; margin: 0; color: #000; }
+h1 { font-size: 20pt; text-align: center; margin: 0 0 8mm; }
+.top { display: flex; align-items: flex-start; justify-content: space-between; margin-bottom: 10mm; }
+.top svg { width: 80mm; height: 80mm; font-family: inherit; }
+.info caption { font-size: 18pt; font-weight: bold; padding-bottom: 2mm; }
+table { border-collapse: collapse; }
+td, th { border: 1px solid #000; padding: 1.5mm 3mm; }
+.info th { background: #f2f2f2; text-align: right; white-space: nowrap; }
+.info td { text-align: left; min-width: 45mm; }
+.result { width: 100%%; }
+.result th { background: #4CAF50; color: #fff; }
+.result td { text-align: center; }
+"""
+
+
+def render_html_report(data, font_path=None):
+    """依 report data 產生自含式 HTML 報表 (bytes)"""
+    info_rows = "".join(f"<tr><th>{escape(label)}</th><td>{escape(str(value))}</td></tr>"
+                        for label, value in data["info"])
+
+    result_rows = []
+    for row in data["rows"]:
+        cells = [row["rank"], row["conscious"], *row["keywords"], row["subconscious"]]
+        result_rows.append("<tr>" + "".join(f"<td>{escape(str(c))}</td>" for c in cells) + "</tr>")
+
+    body = (
+        f"<h1>{escape(data['title'])}</h1>"
+        '<div class="top">'
+        f"{radar_svg(data['scores'])}"
+        f'<table class="info"><caption>{INFO_CAPTION}</caption>{info_rows}</table>'
+        "</div>"
+        '<table class="result">'
+        f'<tr><th style="width:12%">{RESULT_HEADERS[0]}</th><th>{RESULT_HEADERS[1]}</th>'
+        f'<th colspan="3">{RESULT_HEADERS[2]}</th><th>{RESULT_HEADERS[3]}</th></tr>'
+        f"{''.join(result_rows)}"
+        "</table>"
+    )
+
+    face, family = _font_css(font_path, _report_text(data))
+    style = face + CSS % {"family": family}
+
+    html = (
+        '<!DOCTYPE html><html lang="zh-Hant"><head><meta charset="utf-8">'
+        f"<title>{escape(data['title'])}</title><style>{style}</style></head>"
+        f"<body>{body}</body></html>"
+    )
+    return html.encode("utf-8")
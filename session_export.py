@@ -0,0 +1,202 @@
+import os
+import csv
+import sys
+import json
+import argparse
+import threading
+
+# --- 完成場次紀錄與批次匯出 (Session Log / Bulk Export) ---
+# 設定環境變數 WHEEL_SESSION_LOG=<檔案路徑> 後，每位協談者完成時會在該檔尾端追加一行 JSON。
+# 匯出時逐行讀取 (generator)，記憶體用量與場次數量無關，並可用 checkpoint 從中斷處續傳。
+#
+# 用法：python session_export.py sessions.ndjson -o out.csv --format csv \
+#           --since 2026-01-01 --until 2026-01-31 --checkpoint export.ckpt
+
+SESSION_LOG = os.environ.get("WHEEL_SESSION_LOG", "")
+
+FIELDS = [
+    "session_id", "completed_at", "user_info", "importance_scores",
+    "initial_ranked_results", "final_ranked_results",
+    "keywords_map", "deepest_keywords", "comparison_log",
+]
+
+_append_lock = threading.Lock()
+
+
+def append_session(record, path=None):
+    """追加一筆完成場次 (一行 JSON)；未設定路徑時不做任何事"""
+    path = path or SESSION_LOG
+    if not path:
+        return False
+    line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+    with _append_lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+    return True
+
+
+def _in_range(record, since=None, until=None, id_from=None, id_to=None):
+    """日期 (completed_at 的 YYYY-MM-DD) 與 session_id 範圍皆為包含端點
+
+    session_id 以時間開頭，id_to 可只給前綴 (如 20260131)，會包含該前綴下的所有場次。
+    """
+    day = record.get("completed_at", "")[:10]
+    sid = record.get("session_id", "")
+    if since and day < since: return False
+    if until and day > until: return False
+    if id_from and sid < id_from: return False
+    if id_to and sid[:len(id_to)] > id_to: return False
+    return True
+
+
+def _iter_records(path, offset=0):
+    """逐行讀取場次紀錄，yield (下一行的位元組位置, record)
+
+    尚未寫完 (沒有換行結尾) 的最後一行不會被讀取，也不會推進位置，下次續傳時再處理。
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            line = f.readline()
+            if not line or not line.endswith(b"\n"):
+                return
+            offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"⚠️ 略過無法解析的紀錄 (offset {offset - len(line)})", file=sys.stderr)
+                continue
+            yield offset, record
+
+
+def to_ndjson(record):
+    return json.dumps({k: record.get(k) for k in FIELDS}, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def to_csv_row(record):
+    """巢狀欄位以 JSON 字串存放"""
+    row = []
+    for k in FIELDS:
+        value = record.get(k)
+        row.append(value if isinstance(value, str) or value is None else
+                   json.dumps(value, ensure_ascii=False, separators=(",", ":")))
+    return row
+
+
+def load_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {"offset": 0, "exported": 0}
+
+
+def save_checkpoint(path, state):
+    """先寫暫存檔再 rename，避免中斷時留下損壞的 checkpoint"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def export_sessions(src, out, fmt="ndjson", checkpoint=None, every=1000, **filters):
+    """匯出場次至 out (檔案路徑或 '-' 代表 stdout)，回傳本次匯出筆數
+
+    有 checkpoint 時會從上次位置續傳：輸出檔先截回上次 checkpoint 時的大小，
+    再以附加模式寫入，因此中斷後重跑不會產生重複資料。
+    checkpoint 會記錄來源、輸出、格式與篩選條件，續傳時參數不同即拒絕執行；
+    stdout 無法截斷，因此不支援 checkpoint。
+    """
+    if every < 1:
+        raise ValueError("every 必須大於等於 1")
+    if checkpoint and out == "-":
+        raise ValueError("輸出至 stdout 時無法使用 checkpoint 續傳，請以 -o 指定輸出檔")
+
+    src_stat = os.stat(src)
+    params = {"source": os.path.abspath(src), "source_inode": src_stat.st_ino,
+              "output": os.path.abspath(out), "format": fmt,
+              **{k: filters.get(k) for k in ("since", "until", "id_from", "id_to")}}
+    state = load_checkpoint(checkpoint)
+    resuming = state["offset"] > 0
+    if resuming and state.get("params") != params:
+        raise ValueError(f"checkpoint 參數不符 (或來源檔已輪替)，無法續傳：上次為 {state.get('params')}，本次為 {params}")
+    if state["offset"] > src_stat.st_size:
+        raise ValueError(f"來源檔比 checkpoint 位置短 ({src_stat.st_size} < {state['offset']})，可能已被截斷或輪替，無法續傳")
+    state["params"] = params
+
+    if out == "-":
+        f = sys.stdout
+    else:
+        f = open(out, "a" if resuming else "w", encoding="utf-8", newline="")
+        if resuming and "output_bytes" in state:
+            f.truncate(state["output_bytes"])
+
+    def commit():
+        f.flush()
+        state["output_bytes"] = f.tell()
+        save_checkpoint(checkpoint, {**state, "exported": exported + count})
+
+    exported = state["exported"]
+    count = scanned = 0
+    try:
+        writer = csv.writer(f) if fmt == "csv" else None
+        if writer and not resuming:
+            writer.writerow(FIELDS)
+
+        for offset, record in _iter_records(src, state["offset"]):
+            if _in_range(record, **filters):
+                if writer:
+                    writer.writerow(to_csv_row(record))
+                else:
+                    f.write(to_ndjson(record))
+                count += 1
+            state["offset"] = offset
+            scanned += 1
+            if checkpoint and scanned % every == 0:
+                commit()
+
+        if checkpoint:
+            commit()
+    finally:
+        if f is not sys.stdout:
+            f.close()
+        else:
+            f.flush()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批次匯出已完成的協談場次 (NDJSON / CSV)")
+    parser.add_argument("source", nargs="?", default=SESSION_LOG, help="場次紀錄檔 (預設為 WHEEL_SESSION_LOG)")
+    parser.add_argument("-o", "--output", default="-", help="輸出檔案，'-' 為 stdout")
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--since", help="完成日期起 (YYYY-MM-DD，含)")
+    parser.add_argument("--until", help="完成日期迄 (YYYY-MM-DD，含)")
+    parser.add_argument("--id-from", help="session_id 起 (含，可只給前綴如 20260101)")
+    parser.add_argument("--id-to", help="session_id 迄 (含，可只給前綴如 20260131)")
+    parser.add_argument("--checkpoint", help="續傳用 checkpoint 檔")
+    parser.add_argument("--every", type=int, default=1000, help="每讀取幾筆更新一次 checkpoint")
+    args = parser.parse_args(argv)
+
+    if not args.source:
+        parser.error("請指定場次紀錄檔或設定 WHEEL_SESSION_LOG")
+
+    if args.every < 1:
+        parser.error("--every 必須大於等於 1")
+
+    if args.checkpoint and args.output == "-":
+        parser.error("輸出至 stdout 時無法使用 --checkpoint，請以 -o 指定輸出檔")
+
+    try:
+        count = export_sessions(
+            args.source, args.output, fmt=args.format, checkpoint=args.checkpoint, every=args.every,
+            since=args.since, until=args.until, id_from=args.id_from, id_to=args.id_to,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"✅ 匯出 {count} 筆", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()